@@ -1,3 +1,4 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings
 from dotenv import load_dotenv
 
@@ -9,5 +10,14 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
     CORS_ORIGINS: list = ["*"]
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_STORE: str = "rate_limit:InMemoryRateLimitStore"
+    RATE_LIMIT_MAX_IN_FLIGHT: int = Field(100, ge=1)
+    RATE_LIMIT_DEFAULT_CAPACITY: int = Field(60, ge=1)
+    RATE_LIMIT_DEFAULT_REFILL_PER_SECOND: float = Field(1.0, gt=0)
+    RATE_LIMIT_AUTH_CAPACITY: int = Field(5, ge=1)
+    RATE_LIMIT_AUTH_REFILL_PER_SECOND: float = Field(0.1, gt=0)
+    RATE_LIMIT_HEAVY_CAPACITY: int = Field(10, ge=1)
+    RATE_LIMIT_HEAVY_REFILL_PER_SECOND: float = Field(0.2, gt=0)
 
 settings = Settings()
\ No newline at end of file
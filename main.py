@@ -6,6 +6,8 @@ from config import settings
 from exceptions import NotFoundException, BadRequestException, UnauthorizedException, ForbiddenException
 import logging
 from starlette.middleware.sessions import SessionMiddleware
+from collections import Counter
+from rate_limit import RateLimitMiddleware
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -13,6 +15,12 @@ logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Splitwise API")
 
+# Counts of requests shed by the rate limiter, keyed by "<reason>:<route class>"
+app.state.shed_requests = Counter()
+
+# Add rate limiting before CORS so that 429/503 responses still carry CORS headers
+app.add_middleware(RateLimitMiddleware, stats=app.state.shed_requests)
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -0,0 +1,168 @@
+import importlib
+import math
+import time
+from collections import Counter, OrderedDict
+from typing import Callable, Optional, Protocol, Tuple
+from jose import JWTError, jwt
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Receive, Scope, Send
+from config import settings
+
+# Routes that are expensive to serve get their own, tighter buckets.
+# Login and register run bcrypt, the balance/settle routes scan whole tables.
+AUTH_ROUTES = {"/users/login": "login", "/users/register": "register"}
+HEAVY_SUFFIXES = ("/balances", "/settle")
+
+
+class RateLimitStore(Protocol):
+    """
+    Interface for token bucket storage. Implement this on top of a shared
+    backend to enforce limits across multiple workers.
+    """
+
+    async def consume(self, key: str, capacity: int, refill_rate: float) -> float:
+        ...
+
+
+class InMemoryRateLimitStore:
+    """
+    Token buckets kept in process memory. Only suitable for a single worker.
+    When full, the least recently used bucket is evicted.
+    """
+
+    def __init__(self, max_keys: int = 100000, clock: Callable[[], float] = time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+
+    async def consume(self, key: str, capacity: int, refill_rate: float) -> float:
+        """
+        Take one token from the bucket for `key`. Returns 0 if the request is
+        allowed, otherwise the number of seconds until a token is available.
+        """
+        now = self.clock()
+        if key in self._buckets:
+            tokens, last = self._buckets.pop(key)
+            tokens = min(float(capacity), tokens + (now - last) * refill_rate)
+        else:
+            tokens = float(capacity)
+            while len(self._buckets) >= self.max_keys:
+                self._buckets.popitem(last=False)
+        if tokens >= 1:
+            self._buckets[key] = (tokens - 1, now)
+            return 0.0
+        self._buckets[key] = (tokens, now)
+        return (1 - tokens) / refill_rate
+
+
+def load_store(path: str) -> RateLimitStore:
+    """
+    Instantiate the store class given as "module:ClassName".
+    """
+    module_name, _, class_name = path.partition(":")
+    return getattr(importlib.import_module(module_name), class_name)()
+
+
+def classify_route(path: str) -> str:
+    """
+    Map a request path to the route class used for rate limiting.
+    """
+    path = path.rstrip("/") or "/"
+    if path in AUTH_ROUTES:
+        return AUTH_ROUTES[path]
+    if path.startswith("/expenses/") and path.endswith(HEAVY_SUFFIXES):
+        return "heavy"
+    return "default"
+
+
+def client_ip(scope: Scope) -> str:
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+def client_identity(scope: Scope) -> str:
+    """
+    Identify the caller by the username in a valid bearer token, falling back
+    to the client IP for anonymous requests.
+    """
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            if scheme.lower() == "bearer" and token:
+                try:
+                    payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+                except JWTError:
+                    break
+                username = payload.get("sub")
+                if username:
+                    return f"user:{username}"
+            break
+    return client_ip(scope)
+
+
+class RateLimitMiddleware:
+    """
+    ASGI middleware applying a global in-flight cap and per-caller token
+    buckets for each route class. Shed requests are counted in `stats`,
+    keyed by "<reason>:<route class>".
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        store: Optional[RateLimitStore] = None,
+        stats: Optional[Counter] = None,
+    ):
+        self.app = app
+        self.store = store if store is not None else load_store(settings.RATE_LIMIT_STORE)
+        self.stats = stats if stats is not None else Counter()
+        self.in_flight = 0
+        auth_limits = (settings.RATE_LIMIT_AUTH_CAPACITY, settings.RATE_LIMIT_AUTH_REFILL_PER_SECOND)
+        self.limits = {
+            "login": auth_limits,
+            "register": auth_limits,
+            "heavy": (settings.RATE_LIMIT_HEAVY_CAPACITY, settings.RATE_LIMIT_HEAVY_REFILL_PER_SECOND),
+            "default": (settings.RATE_LIMIT_DEFAULT_CAPACITY, settings.RATE_LIMIT_DEFAULT_REFILL_PER_SECOND),
+        }
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] != "http" or not settings.RATE_LIMIT_ENABLED:
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify_route(scope["path"])
+
+        if self.in_flight >= settings.RATE_LIMIT_MAX_IN_FLIGHT:
+            self.stats[f"overloaded:{route_class}"] += 1
+            response = JSONResponse(
+                status_code=503,
+                content={"detail": "Server is busy. Please try again later."},
+                headers={"Retry-After": "1"},
+            )
+            await response(scope, receive, send)
+            return
+
+        # Claim the slot before awaiting the store so concurrent requests
+        # cannot all pass the in-flight check at once.
+        self.in_flight += 1
+        try:
+            # Unauthenticated routes are keyed by IP so that presenting
+            # different tokens does not grant a fresh budget.
+            if route_class in AUTH_ROUTES.values():
+                identity = client_ip(scope)
+            else:
+                identity = client_identity(scope)
+            capacity, refill_rate = self.limits[route_class]
+            wait = await self.store.consume(f"{route_class}:{identity}", capacity, refill_rate)
+            if wait > 0:
+                self.stats[f"rate_limited:{route_class}"] += 1
+                response = JSONResponse(
+                    status_code=429,
+                    content={"detail": "Too many requests. Please slow down."},
+                    headers={"Retry-After": str(max(1, math.ceil(wait)))},
+                )
+                await response(scope, receive, send)
+                return
+            await self.app(scope, receive, send)
+        finally:
+            self.in_flight -= 1
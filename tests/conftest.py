@@ -0,0 +1,7 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("SPLITWISE_PROJECT_KEY", "test_project_key")
+os.environ.setdefault("SECRET_KEY", "test_secret_key")
@@ -0,0 +1,169 @@
+import asyncio
+from collections import Counter
+import pytest
+from pydantic import ValidationError
+from jose import jwt
+from config import Settings, settings
+from rate_limit import InMemoryRateLimitStore, RateLimitMiddleware, classify_route, load_store
+
+
+def create_access_token(data):
+    return jwt.encode(data, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+async def call(app, path, ip="1.2.3.4", token=None):
+    headers = [(b"authorization", f"Bearer {token}".encode())] if token else []
+    scope = {"type": "http", "method": "GET", "path": path, "headers": headers, "client": (ip, 1234)}
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app(scope, receive, send)
+    start = messages[0]
+    return start["status"], dict((k.decode(), v.decode()) for k, v in start["headers"])
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_bucket_refills_over_time():
+    clock = FakeClock()
+    store = InMemoryRateLimitStore(clock=clock)
+    assert [run(store.consume("a", 2, 0.5)) for _ in range(2)] == [0.0, 0.0]
+    assert run(store.consume("a", 2, 0.5)) == pytest.approx(2.0)
+    clock.now = 2.0
+    assert run(store.consume("a", 2, 0.5)) == 0.0
+    clock.now = 100.0
+    assert [run(store.consume("a", 2, 0.5)) for _ in range(3)] == [0.0, 0.0, pytest.approx(2.0)]
+
+
+def test_full_store_evicts_least_recently_used_only():
+    store = InMemoryRateLimitStore(max_keys=2, clock=FakeClock())
+    run(store.consume("blocked", 1, 0.001))
+    assert run(store.consume("blocked", 1, 0.001)) > 0
+    run(store.consume("y", 1, 1.0))
+    run(store.consume("blocked", 1, 0.001))  # touch so "y" becomes the oldest
+    run(store.consume("z", 1, 1.0))
+    assert run(store.consume("blocked", 1, 0.001)) > 0
+    assert "y" not in store._buckets
+
+
+def test_store_is_selected_from_settings():
+    assert isinstance(load_store("rate_limit:InMemoryRateLimitStore"), InMemoryRateLimitStore)
+    assert isinstance(RateLimitMiddleware(ok_app).store, InMemoryRateLimitStore)
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("/users/login", "login"),
+    ("/users/login/", "login"),
+    ("/users/register", "register"),
+    ("/users/me", "default"),
+    ("/expenses/user/balances", "heavy"),
+    ("/expenses/g1/balances/", "heavy"),
+    ("/expenses/g1/settle", "heavy"),
+    ("/expenses/g1/e1", "default"),
+    ("/", "default"),
+])
+def test_classify_route(path, expected):
+    assert classify_route(path) == expected
+
+
+@pytest.mark.parametrize("field, value", [
+    ("RATE_LIMIT_AUTH_REFILL_PER_SECOND", 0),
+    ("RATE_LIMIT_DEFAULT_CAPACITY", 0),
+    ("RATE_LIMIT_MAX_IN_FLIGHT", 0),
+])
+def test_settings_reject_invalid_limits(field, value):
+    with pytest.raises(ValidationError):
+        Settings(**{field: value})
+
+
+def test_rate_limited_response_and_counters():
+    stats = Counter()
+    clock = FakeClock()
+    app = RateLimitMiddleware(ok_app, store=InMemoryRateLimitStore(clock=clock), stats=stats)
+    for _ in range(settings.RATE_LIMIT_AUTH_CAPACITY):
+        assert run(call(app, "/users/login"))[0] == 200
+    status, headers = run(call(app, "/users/login"))
+    assert status == 429
+    assert headers["retry-after"] == str(round(1 / settings.RATE_LIMIT_AUTH_REFILL_PER_SECOND))
+    assert stats == Counter({"rate_limited:login": 1})
+    # Register and other IPs have their own buckets
+    assert run(call(app, "/users/register"))[0] == 200
+    assert run(call(app, "/users/login", ip="5.6.7.8"))[0] == 200
+    assert app.in_flight == 0
+
+
+def test_login_is_keyed_by_ip_not_token():
+    app = RateLimitMiddleware(ok_app, store=InMemoryRateLimitStore(clock=FakeClock()))
+    for i in range(settings.RATE_LIMIT_AUTH_CAPACITY):
+        token = create_access_token({"sub": f"user{i}"})
+        assert run(call(app, "/users/login", token=token))[0] == 200
+    token = create_access_token({"sub": "another"})
+    assert run(call(app, "/users/login", token=token))[0] == 429
+
+
+def test_authenticated_routes_are_keyed_by_user():
+    app = RateLimitMiddleware(ok_app, store=InMemoryRateLimitStore(clock=FakeClock()))
+    alice = create_access_token({"sub": "alice"})
+    bob = create_access_token({"sub": "bob"})
+    for _ in range(settings.RATE_LIMIT_HEAVY_CAPACITY):
+        assert run(call(app, "/expenses/user/balances", token=alice))[0] == 200
+    assert run(call(app, "/expenses/user/balances", token=alice))[0] == 429
+    assert run(call(app, "/expenses/user/balances", token=bob))[0] == 200
+
+
+def test_in_flight_cap_sheds_with_503(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_MAX_IN_FLIGHT", 2)
+
+    class SlowStore:
+        async def consume(self, key, capacity, refill_rate):
+            await asyncio.sleep(0)
+            return 0.0
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow_app(scope, receive, send):
+            await release.wait()
+            await ok_app(scope, receive, send)
+
+        stats = Counter()
+        app = RateLimitMiddleware(slow_app, store=SlowStore(), stats=stats)
+        tasks = [asyncio.ensure_future(call(app, "/groups/")) for _ in range(4)]
+        await asyncio.sleep(0.01)
+        release.set()
+        results = await asyncio.gather(*tasks)
+        return app, stats, results
+
+    app, stats, results = run(scenario())
+    statuses = sorted(status for status, _ in results)
+    assert statuses == [200, 200, 503, 503]
+    assert all(headers["retry-after"] == "1" for status, headers in results if status == 503)
+    assert stats == Counter({"overloaded:default": 2})
+    assert app.in_flight == 0
+
+
+def test_disabled_passes_through(monkeypatch):
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", False)
+    app = RateLimitMiddleware(ok_app, store=InMemoryRateLimitStore(clock=FakeClock()))
+    for _ in range(settings.RATE_LIMIT_AUTH_CAPACITY + 1):
+        assert run(call(app, "/users/login"))[0] == 200